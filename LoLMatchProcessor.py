@@ -1,21 +1,61 @@
 
 
 import requests
+from requests.adapters import HTTPAdapter
+import orjson
 import pandas as pd
+import numpy as np
 import time
-from collections import defaultdict
+import asyncio
+import aiohttp
 import os
+from concurrent.futures import ProcessPoolExecutor
+from MatchCache import MatchCache
+from RiotRateLimiter import RiotRateLimiter
+
+#ward types that count toward the vision stats — trinkets and control wards only
+_KEPT_WARDS = frozenset({'YELLOW_TRINKET', 'BLUE_TRINKET', 'CONTROL_WARD'})
 
 class LoLMatchProcessor:
-    def __init__(self, api_key=None, region='americas'):
+    def __init__(self, api_key=None, region='americas', requests_per_second=20, max_connections=64,
+                 cache_path='match_cache.sqlite', stats_workers=None):
         self.api_key = api_key or os.getenv("RIOT_API_KEY")
         if not self.api_key:
             raise ValueError("API key not provided. Set RIOT_API_KEY in .env or pass directly.")
         self.headers = {"X-Riot-Token": self.api_key}
         self.base_url = f"https://{region}.api.riotgames.com/lol/match/v5/matches"
+        #one pooled session for the sync helpers so every request reuses the same
+        #tcp+tls connection instead of handshaking from scratch
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+        #riot dev keys allow 20 requests/second. bump this if you have a production key
+        self.requests_per_second = requests_per_second
+        self.max_connections = max_connections
+        #cache_path = None disables the on disk cache
+        self.cache = MatchCache(cache_path) if cache_path else None
+        #stats_workers > 1 runs the per match stats pass in a process pool. worth it when
+        #the stats pass dominates; leave at None to stay in-process
+        self.stats_workers = stats_workers
+
+    def _make_limiter(self):
+        #token bucket shared by every request in one asyncio run. starts from the
+        #configured requests/second and resizes itself from riot's rate limit headers
+        return RiotRateLimiter(self.requests_per_second)
+
+    def _make_connector(self):
+        return aiohttp.TCPConnector(limit_per_host=self.max_connections)
+
+    def get_apex_puuids_ids(self, region='na1', cache_ttl=3600):
+        #gets apex tiers puuids, to then get match ids.
+        #the apex ladder changes slowly, so the list is cached on disk per region and
+        #reused for cache_ttl seconds — saves the three league page fetches (and their
+        #rate limit tokens) on every rerun. cache_ttl = 0 forces a fresh fetch
+        cache_file = f"apex_puuids_{region}.parquet"
+        if cache_ttl and os.path.exists(cache_file) and time.time() - os.path.getmtime(cache_file) < cache_ttl:
+            print(f"Using cached apex puuids from {cache_file}")
+            return pd.read_parquet(cache_file)['puuid'].to_numpy()
 
-    def get_apex_puuids_ids(self, region='na1'):
-        #gets apex tiers puuids, to then get match ids
         tiers = ['challenger', 'grandmaster', 'master']
         tier_endpoints = {
             'challenger': f'https://{region}.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5',
@@ -25,49 +65,30 @@ class LoLMatchProcessor:
 
         for tier in tiers:
             url = tier_endpoints[tier]
-            resp = requests.get(url, headers=self.headers)
+            resp = self.session.get(url)
 
             if resp.status_code == 200:
-                entries = pd.json_normalize(resp.json().get("entries", []))
+                entries = pd.json_normalize(orjson.loads(resp.content).get("entries", []))
                 all_entries.append(entries)
             else:
                 print(f"Failed to fetch {tier} data. Status: {resp.status_code}")
 
         if all_entries:
             combined = pd.concat(all_entries, ignore_index=True)
-            return combined['puuid'].dropna().unique()
+            puuids = combined['puuid'].dropna().unique()
+            if cache_ttl:
+                pd.DataFrame({'puuid': puuids}).to_parquet(cache_file, index=False)
+            return puuids
         else:
             print("No players retrieved.")
             return []
 
     def get_apex_tiers_match_ids(self, puuids, region='americas', delay=10, max_retries=5, return_samples = False):
         #get apex tier match ids by passing puuids to api. Returns 100 match ids and ranked 5v5 queue only(queue = 420)
-        
-        #return_samples = True returns 4 match ID samples of 5k each
-        match_id_list = []
-
-        for i, puuid in enumerate(puuids):
-            print(f"Fetching matches for PUUID {i+1}/{len(puuids)}")
-
-            url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&start=0&count=100"
-
-            for attempt in range(max_retries):
-                resp = requests.get(url, headers=self.headers)
-                print(f"Status {resp.status_code} for PUUID {puuid}")
 
-                if resp.status_code == 200:
-                    match_ids = resp.json()
-                    match_id_df = pd.DataFrame(match_ids, columns=['match_id'])
-                    match_id_list.append(match_id_df)
-                    break
-
-                elif resp.status_code == 429:
-                    print(f"Rate limit hit. Sleeping {delay} seconds (Attempt {attempt+1}/{max_retries})")
-                    time.sleep(delay)
-
-                else:
-                    print(f"Failed for PUUID: {puuid} with status {resp.status_code}")
-                    break
+        #return_samples = True returns 4 match ID samples of 5k each
+        #fetches are async now so all puuids are requested in parallel under the rate limiter
+        match_id_list = asyncio.run(self._fetch_all_match_ids(puuids, region, delay, max_retries))
         #very low api rate limits so reducing all match ids to random sample of 20k for processing
         #big enough sample size to get meaningful model results after filtering out bad matches
         if match_id_list:
@@ -85,14 +106,32 @@ class LoLMatchProcessor:
             print("No match IDs retrieved.")
             return pd.DataFrame(columns=['match_id'])
 
-        
+    async def _fetch_all_match_ids(self, puuids, region, delay, max_retries):
+        #async fan-out over all puuids. each one returns a small df of match ids
+        limiter = self._make_limiter()
+        async with aiohttp.ClientSession(connector=self._make_connector(), headers=self.headers) as session:
+            tasks = []
+            for puuid in puuids:
+                url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&start=0&count=100"
+                tasks.append(self._safe_get_async(session, limiter, url, max_retries=max_retries, base_delay=delay))
+            results = await asyncio.gather(*tasks)
+
+        match_id_list = []
+        for puuid, match_ids in zip(puuids, results):
+            if match_ids is None:
+                print(f"Failed to fetch match ids for PUUID: {puuid}")
+                continue
+            match_id_list.append(pd.DataFrame(match_ids, columns=['match_id']))
+        return match_id_list
+
+
     def fetch_with_retry(self, url):
         while True:
-            resp = requests.get(url, headers = self.headers)
+            resp = self.session.get(url)
             print(f" Status {resp.status_code} for {url}")
 
             try:
-                data = resp.json()
+                data = orjson.loads(resp.content)
             except Exception:
                 print(" Could not parse JSON")
                 return None
@@ -101,8 +140,9 @@ class LoLMatchProcessor:
                 print(" Data received:", list(data.keys()))
                 return data
             elif resp.status_code == 429:
-                print(" 429 rate limit. Sleeping 10s")
-                time.sleep(10)
+                retry_after = int(resp.headers.get('Retry-After', 10))
+                print(f" 429 rate limit. Sleeping {retry_after}s")
+                time.sleep(retry_after)
             elif resp.status_code == 403:
                 print(" 403 Forbidden. Is your API key expired?")
                 return None
@@ -112,335 +152,382 @@ class LoLMatchProcessor:
             
 
     def fetch_match_data(self, match_id):
+        cached = self.cache.get(match_id, 'match') if self.cache else None
+        if cached is not None:
+            return cached
         url = f"{self.base_url}/{match_id}"
-        return self._safe_get(url)
+        data = self._safe_get(url)
+        if self.cache and data is not None:
+            self.cache.put(match_id, 'match', data)
+        return data
 
     def fetch_timeline_data(self, match_id):
+        cached = self.cache.get(match_id, 'timeline') if self.cache else None
+        if cached is not None:
+            return cached
         url = f"{self.base_url}/{match_id}/timeline"
-        return self._safe_get(url)
+        data = self._safe_get(url)
+        if self.cache and data is not None:
+            self.cache.put(match_id, 'timeline', data)
+        return data
 
     def _safe_get(self, url, max_retries=3):
         for _ in range(max_retries):
-            resp = requests.get(url, headers=self.headers)
+            resp = self.session.get(url)
             if resp.status_code == 200:
-                return resp.json()
+                return orjson.loads(resp.content)
             elif resp.status_code == 429:
-                time.sleep(10)
+                time.sleep(int(resp.headers.get('Retry-After', 10)))
             elif resp.status_code in (403, 401, 404):
                 return None
         return None
 
-    def get_14_min_stats(self, match_id, match_data, timeline_data):
-        #get 14 min stats of all games passed through. filter out non ranked 5v5 games(queue = 420)
-        #and anything on patch 15.9
-        
-        queue_id = match_data['info'].get('queueId')
+    async def _safe_get_async(self, session, limiter, url, max_retries=5, base_delay=1):
+        #async version of _safe_get. waits on the shared rate limiter before every request,
+        #honors Retry-After on 429 and backs off exponentially otherwise
+        delay = base_delay
+        for attempt in range(max_retries):
+            await limiter.acquire()
+            try:
+                async with session.get(url) as resp:
+                    limiter.update_from_headers(resp.headers)
+                    if resp.status == 200:
+                        return await resp.json(loads=orjson.loads)
+                    elif resp.status == 429:
+                        retry_after = int(resp.headers.get('Retry-After', delay))
+                        print(f"429 rate limit. Sleeping {retry_after}s (Attempt {attempt+1}/{max_retries})")
+                        await asyncio.sleep(retry_after)
+                        delay *= 2
+                    elif resp.status in (403, 401, 404):
+                        print(f"Status {resp.status} for {url}")
+                        return None
+                    else:
+                        print(f"Unexpected status {resp.status} for {url}")
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                #connection resets, server disconnects and client timeouts are transient —
+                #back off and retry instead of letting one flaky request kill the whole run
+                print(f"Network error for {url}: {e} (Attempt {attempt+1}/{max_retries})")
+                await asyncio.sleep(delay)
+                delay *= 2
+        return None
+
+    async def _fetch_cached(self, session, limiter, match_id, endpoint):
+        #check the disk cache before spending a rate limit token on the api
+        if self.cache:
+            cached = self.cache.get(match_id, endpoint)
+            if cached is not None:
+                return cached
+        url = f"{self.base_url}/{match_id}"
+        if endpoint == 'timeline':
+            url += '/timeline'
+        data = await self._safe_get_async(session, limiter, url)
+        if self.cache and data is not None:
+            self.cache.put(match_id, endpoint, data)
+        return data
+
+    @staticmethod
+    def _match_passes_filters(match_id, match_data):
+        #queue/patch filter shared by the fetch layer and get_14_min_stats. running it
+        #before the timeline request means a filtered match never costs one
+        if not match_data or 'info' not in match_data:
+            return False
         game_version = match_data['info'].get('gameVersion', '')
-        
+
         #remove newest patch only (15.9 at this time)
         if game_version.startswith("15.9"):
             print(f"Skipping {match_id} — patch 15.9 (version: {game_version})")
-            return pd.DataFrame()
-        
+            return False
+
         # Skip non-ranked matches
-        if queue_id != 420:
-            return pd.DataFrame()
+        if match_data['info'].get('queueId') != 420:
+            return False
+        return True
+
+    async def _fetch_pair(self, session, limiter, match_id):
+        #fetch match data first and only spend a timeline request (the largest riot
+        #endpoint) on matches that survive the queue/patch filters.
+        #a network failure here must only lose this one match — everything runs under one
+        #gather, so an uncaught exception would abort the whole batch run
+        try:
+            match_data = await self._fetch_cached(session, limiter, match_id, 'match')
+            if not self._match_passes_filters(match_id, match_data):
+                return match_id, match_data, None
+            timeline_data = await self._fetch_cached(session, limiter, match_id, 'timeline')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Network error fetching {match_id}: {e}")
+            return match_id, None, None
+        return match_id, match_data, timeline_data
+
+    @staticmethod
+    def get_14_min_stats(match_data, timeline_data):
+        #get 14 min stats of one game. filter out non ranked 5v5 games(queue = 420)
+        #and anything on patch 15.9.
+        #returns a dict of column -> numpy array (one entry per participant), or None when
+        #the match is filtered out, so batch runs can build a single dataframe at the very
+        #end instead of allocating one tiny dataframe and merge per match
+
+        match_id = match_data['metadata']['matchId']
+        #the batch pipeline already filtered before fetching the timeline, re-check here
+        #so the method stays safe to call on its own
+        if not LoLMatchProcessor._match_passes_filters(match_id, match_data):
+            return None
 
         frames = timeline_data['info']['frames']
-        
-        #moving info we need to participants df
-        participants = pd.json_normalize(match_data['info']['participants'])[
-            ['participantId', 'championName', 'teamId','firstBloodKill',
-            'teamPosition','win']]
         #checking to make sure game does last 14 minutes
         if len(frames) <= 14 or 'participantFrames' not in frames[14]:
             print(f"{match_id} is too short or missing frame 14")
+            return None
+
+        #sort participants by id so every column lines up positionally, and validate the
+        #expected 10 unique ids (replaces the old merge's validate='one_to_one')
+        participants = sorted(match_data['info']['participants'], key=lambda p: p['participantId'])
+        participant_ids = np.array([p['participantId'] for p in participants], dtype=np.int8)
+        if len(participant_ids) != 10 or len(np.unique(participant_ids)) != 10:
+            print(f"{match_id} has a malformed participant list")
+            return None
+
+        #14th minute data of the game, keyed by participant id in the timeline json
+        frame14 = frames[14]['participantFrames']
+        try:
+            minute14 = [frame14[str(pid)] for pid in participant_ids]
+        except KeyError:
+            print(f"{match_id} is missing minute 14 data for a participant")
+            return None
+
+        total_gold = np.array([d['totalGold'] for d in minute14], dtype=np.int32)
+        minions_killed = np.array([d['minionsKilled'] for d in minute14], dtype=np.int32)
+        jungle_minions_killed = np.array([d['jungleMinionsKilled'] for d in minute14], dtype=np.int32)
+        total_minions_killed = minions_killed + jungle_minions_killed
+        xp = np.array([d['xp'] for d in minute14], dtype=np.int32)
+        level = np.array([d['level'] for d in minute14], dtype=np.int8)
+        team_ids = np.array([p['teamId'] for p in participants], dtype=np.int16)
+
+        #flatten every event from minute 0-14 once. each counter is then a bincount
+        #histogram over a small int array — no per-event dataframe, no mask machinery
+        events = [e for frame in frames[:15] for e in frame.get('events', [])
+                  if e.get('timestamp', 0) <= 840000]
+
+        def _participant_bincount(ids_iter):
+            #histogram event ids over participantId 1..10, aligned to sorted participants.
+            #id 0 (minion/tower credit) and anything out of range is dropped, matching the
+            #old 'if killer:' guards
+            ids = np.fromiter(ids_iter, dtype=np.int64)
+            counts = np.bincount(ids[(ids >= 1) & (ids <= 10)], minlength=11).astype(np.int8)
+            return counts[participant_ids]
+
+        def _team_bincount(monster_type):
+            #count elite monster kills per team, teamId is only ever 100 or 200
+            teams = np.fromiter((e.get('killerTeamId') or 0 for e in events
+                                 if e['type'] == 'ELITE_MONSTER_KILL'
+                                 and e.get('monsterType') == monster_type), dtype=np.int64)
+            counts = np.bincount(teams[teams > 0], minlength=201)
+            return np.where(team_ids == 100, counts[100], counts[200]).astype(np.int8)
+
+        #champion kill events assigned to killer/victim/assisters
+        kill_events = [e for e in events if e['type'] == 'CHAMPION_KILL']
+        kills_14 = _participant_bincount(e.get('killerId') or 0 for e in kill_events)
+        deaths_14 = _participant_bincount(e.get('victimId') or 0 for e in kill_events)
+        assists_14 = _participant_bincount(
+            aid for e in kill_events for aid in e.get('assistingParticipantIds', []))
+
+        #plate destruction assigned to the correct participant
+        plates_taken = _participant_bincount(
+            e.get('killerId') or 0 for e in events if e['type'] == 'TURRET_PLATE_DESTROYED')
+
+        #tower kills assigned to the correct participant
+        towers_killed = _participant_bincount(
+            e.get('killerId') or 0 for e in events
+            if e['type'] == 'BUILDING_KILL' and e.get('buildingType') == 'TOWER_BUILDING')
+
+        #wards placed assigned to the correct participant, trinket and control wards only
+        wards_placed = _participant_bincount(
+            e.get('creatorId') or 0 for e in events
+            if e['type'] == 'WARD_PLACED' and e.get('wardType') in _KEPT_WARDS)
+
+        #rename the team position utility to support. convert TRUE/FALSE win to 1/0
+        team_position = np.array(['SUPPORT' if p['teamPosition'] == 'UTILITY' else p['teamPosition']
+                                  for p in participants], dtype=object)
+
+        return {
+            'match_id': np.repeat(match_data['metadata']['matchId'], 10),
+            'participantId': participant_ids,
+            'championName': np.array([p['championName'] for p in participants], dtype=object),
+            'totalGold': total_gold,
+            'goldPerMinute': total_gold / 14,
+            'minionsKilled': minions_killed,
+            'jungleMinionsKilled': jungle_minions_killed,
+            'totalMinionsKilled': total_minions_killed,
+            'csPerMinute': total_minions_killed / 14,
+            'xp': xp,
+            'level': level,
+            'wards_placed': wards_placed,
+            'kills_14': kills_14,
+            'deaths_14': deaths_14,
+            'assists_14': assists_14,
+            'platesTaken_14': plates_taken,
+            'towersKilled_14': towers_killed,
+            'firstBloodKill': np.array([int(p['firstBloodKill']) for p in participants], dtype=np.int8),
+            'teamDragonKills_14': _team_bincount('DRAGON'),
+            'teamHordeKills_14': _team_bincount('HORDE'),
+            'teamId': team_ids,
+            'teamPosition': team_position,
+            'win': np.array([int(p['win']) for p in participants], dtype=np.int8)}
+
+    @staticmethod
+    def build_players_frame(match_stats):
+        #combine the per match stat dicts from get_14_min_stats into one dataframe with a
+        #single allocation per column, instead of concatenating thousands of 10-row frames
+        match_stats = [stats for stats in match_stats if stats]
+        if not match_stats:
             return pd.DataFrame()
-        
-        #for loop to get all values from each key for the 14th minute data of the game
-        #store it in an empty list and append to it
-        frame14_data = []
-        for id, data in frames[14]['participantFrames'].items():
-            data['participantId'] = int(id)
-            frame14_data.append(data)
-
-        minute14_df = pd.json_normalize(frame14_data)
-
-        #merging both dataframes on participantID 
-        players = participants.merge(minute14_df, on='participantId')
-        #adding gold per minute and cs(creep score) per minute
-        players['goldPerMinute'] = players['totalGold']/ 14
-        players['csPerMinute'] = (players['minionsKilled'] + players['jungleMinionsKilled'])/ 14
-        players['match_id'] = match_data['metadata']['matchId']
-
-        kills_14 = defaultdict(int)
-        deaths_14 = defaultdict(int)
-        assists_14 = defaultdict(int)
-        plates_taken = defaultdict(int)
-        towers_killed = defaultdict(int)
-        dragons = defaultdict(int)
-        horde_kills = defaultdict(int)
-        wards_placed = defaultdict(int)
-
-        #minute 0-14
-        for frame in frames[:15]:
-                for event in frame.get('events', []):
-                    t = event.get('timestamp', 0)
-                    if t > 840000:
-                        continue
-                    #get champion kill events and assign to correct participant
-                    if event['type'] == 'CHAMPION_KILL':
-                        killer = event.get('killerId')
-                        victim = event.get('victimId')
-                        assist = event.get('assistingParticipantIds',[])
-                        if killer:
-                            kills_14[killer] +=1
-                        if victim:
-                            deaths_14[victim] +=1
-                        for aid in assist:
-                            assists_14[aid] +=1
-
-                    #plate destruction and assign to correct participant
-                    if event['type'] == 'TURRET_PLATE_DESTROYED':
-                        id = event.get('killerId')
-                        if id:
-                            plates_taken[id] += 1
-        
-                    #tower kills and assign to correct participant
-                    if event['type'] == 'BUILDING_KILL' and event.get('buildingType') == 'TOWER_BUILDING':
-                        id = event.get('killerId')
-                        if id:
-                            towers_killed[id] += 1
-        
-                    #track dragon kills and assign to correct team
-                    #track void grub kills(HORDE) and assign to correct team
-                    if event['type'] == 'ELITE_MONSTER_KILL':
-                        team_id = event.get('killerTeamId')
-                        if team_id:
-                            if event.get('monsterType') == 'DRAGON':
-                                dragons[team_id] += 1
-                            elif event.get('monsterType') == 'HORDE':
-                                horde_kills[team_id] += 1
-                    #track wards placed and assign to correct participant       
-                    if event['type'] == 'WARD_PLACED':
-                        ward_type = event.get('wardType')
-                        pid = event.get('creatorId')
-                        if ward_type in ['YELLOW_TRINKET', 'BLUE_TRINKET', 'CONTROL_WARD']:
-                            wards_placed[pid] += 1
-                        
-        #map all of these features tracked  to the correct participant/team and return them                  
-        players['platesTaken_14'] = players['participantId'].map(plates_taken).fillna(0).astype(int)
-        players['towersKilled_14'] = players['participantId'].map(towers_killed).fillna(0).astype(int)
-        players['teamDragonKills_14'] = players['teamId'].map(dragons).fillna(0).astype(int)
-        players['teamHordeKills_14'] = players['teamId'].map(horde_kills).fillna(0).astype(int)
-        players['kills_14'] = players['participantId'].map(kills_14).fillna(0).astype(int)
-        players['assists_14'] = players['participantId'].map(assists_14).fillna(0).astype(int)
-        players['deaths_14'] = players['participantId'].map(deaths_14).fillna(0).astype(int)
-        players['wards_placed'] = players['participantId'].map(wards_placed).fillna(0).astype(int)
-        #adding gold per minute and cs(creep score) per minute
-        players['goldPerMinute'] = players['totalGold']/ 14
-        players['csPerMinute'] = (players['minionsKilled'] + players['jungleMinionsKilled'])/ 14
-        players['match_id'] = match_data['metadata']['matchId']
-        #rename the team position utility to support. convert TRUE/FALSE win to 1/0 
-        players['teamPosition'] = players['teamPosition'].replace({'UTILITY': 'SUPPORT'})
-        players['win'] = players['win'].astype(int)
-        players['firstBloodKill'] = players['firstBloodKill'].astype(int)
-        players['totalMinionsKilled'] = players['minionsKilled'] + players['jungleMinionsKilled']
-        return players[[
-                'match_id','participantId','championName',
-                'totalGold', 'goldPerMinute',
-                'minionsKilled', 'jungleMinionsKilled',
-                'totalMinionsKilled','csPerMinute',
-                'xp', 'level','wards_placed',
-                'kills_14', 'deaths_14', 'assists_14',
-                'platesTaken_14', 'towersKilled_14', 'firstBloodKill',
-                'teamDragonKills_14', 'teamHordeKills_14','teamId','teamPosition','win']]
-
-
-    def process_matches_batch(self, match_ids, batch_size=50, pause_time=120, checkpoint_path=None):
-        #if checkpoint_path = True then periodic saving to the checkpoint path after each batch processed.
-        
+        players = pd.DataFrame({col: np.concatenate([stats[col] for stats in match_stats])
+                                for col in match_stats[0]})
+        #champion and role have tiny fixed domains — category dtype shrinks the frame and
+        #makes the later groupbys hash-free. one astype call converts both without
+        #rewriting the columns one at a time
+        return players.astype({'championName': 'category', 'teamPosition': 'category'})
+
+
+    def process_matches_batch(self, match_ids, batch_size=50, pause_time=None, checkpoint_path=None):
+        #if checkpoint_path is set it is treated as a directory and each batch is appended
+        #as its own parquet file, so checkpoint i/o stays proportional to new rows instead
+        #of rewriting every processed row after every batch like the old growing csv did.
+        #pause_time is kept for backward compatibility but ignored — the rate limiter
+        #paces requests against riot's advertised windows instead of a blind sleep
+        return asyncio.run(self._process_matches_batch(match_ids, batch_size, checkpoint_path))
+
+    async def _process_matches_batch(self, match_ids, batch_size, checkpoint_path):
+        #fetches every match in a batch concurrently (match + timeline in parallel per id),
+        #then runs the synchronous stats pass over the downloaded json
         all_data = []
+        batches_written = 0
         start_time = time.time()
-
-        for i in range(0, len(match_ids), batch_size):
-            batch = match_ids[i:i + batch_size]
-            print(f"\n Processing matches {i+1} to {i+len(batch)} of {len(match_ids)}")
-
-            for j, match_id in enumerate(batch, 1):
-                try:
-                    print(f"{match_id} ({i+j}/{len(match_ids)})")
-
-                    match_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{match_id}"
-                    match_data = self.fetch_with_retry(match_url)
-
-                    if not match_data or 'info' not in match_data:
-                        print(f" Skipping {match_id} — match data invalid")
-                        continue
-
-                    timeline_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
-                    timeline_data = self.fetch_with_retry(timeline_url)
-
-                    if not timeline_data or 'info' not in timeline_data:
-                        print(f"Skipping {match_id} — timeline data invalid")
-                        continue
-
-                    df = self.get_14_min_stats(match_id, match_data, timeline_data)
-
-                    if df.empty:
-                        print(f"Match {match_id} returned no valid 14-min stats (skipped)")
+        limiter = self._make_limiter()
+
+        if checkpoint_path:
+            os.makedirs(checkpoint_path, exist_ok=True)
+
+        executor = ProcessPoolExecutor(max_workers=self.stats_workers) if self.stats_workers else None
+
+        try:
+            async with aiohttp.ClientSession(connector=self._make_connector(), headers=self.headers) as session:
+                for i in range(0, len(match_ids), batch_size):
+                    batch = match_ids[i:i + batch_size]
+                    print(f"\n Processing matches {i+1} to {i+len(batch)} of {len(match_ids)}")
+
+                    results = await asyncio.gather(
+                        *(self._fetch_pair(session, limiter, match_id) for match_id in batch))
+
+                    #weed out failed fetches first, then run the stats pass on what's left
+                    pairs = []
+                    for match_id, match_data, timeline_data in results:
+                        if not match_data or 'info' not in match_data:
+                            print(f" Skipping {match_id} — match data invalid")
+                            continue
+
+                        if timeline_data is None:
+                            #filtered out by queue/patch before the timeline was fetched,
+                            #or the timeline fetch itself failed — nothing to process
+                            continue
+
+                        if 'info' not in timeline_data:
+                            print(f"Skipping {match_id} — timeline data invalid")
+                            continue
+
+                        pairs.append((match_id, match_data, timeline_data))
+
+                    batch_data = []
+
+                    def _collect(match_id, stats):
+                        if stats is None:
+                            print(f"Match {match_id} returned no valid 14-min stats (skipped)")
+                        else:
+                            batch_data.append(stats)
+
+                    #each match's stats pass is independent, so with stats_workers set they
+                    #are dispatched across cores; the staticmethod keeps the worker picklable.
+                    #the try/except here only isolates the stats pass — fetch failures are
+                    #contained upstream by _safe_get_async/_fetch_pair, which turn transport
+                    #errors into a skipped match instead of an exception
+                    if executor is not None:
+                        futures = [(match_id, executor.submit(LoLMatchProcessor.get_14_min_stats,
+                                                              match_data, timeline_data))
+                                   for match_id, match_data, timeline_data in pairs]
+                        for match_id, future in futures:
+                            try:
+                                _collect(match_id, future.result())
+                            except Exception as e:
+                                print(f"Error processing {match_id}: {e}")
+                    else:
+                        for match_id, match_data, timeline_data in pairs:
+                            try:
+                                _collect(match_id, self.get_14_min_stats(match_data, timeline_data))
+                            except Exception as e:
+                                print(f"Error processing {match_id}: {e}")
+
+                    #append this batch's rows as one parquet file, otherwise hold them in memory
+                    if checkpoint_path and batch_data:
+                        batch_df = self.build_players_frame(batch_data)
+                        batch_file = os.path.join(checkpoint_path, f"batch_{i // batch_size:05d}.parquet")
+                        batch_df.to_parquet(batch_file, compression='zstd', index=False)
+                        batches_written += 1
+                        print(f"Checkpoint saved to {batch_file}")
                     else:
-                        all_data.append(df)
+                        all_data.extend(batch_data)
 
-                except Exception as e:
-                    print(f"Error processing {match_id}: {e}")
-                    continue
+                    #no fixed sleep between batches — the shared rate limiter already paces
+                    #every request to riot's advertised windows
 
-            #save partial results after each batch
-            if checkpoint_path and all_data:
-                partial_df = pd.concat(all_data, ignore_index=True)
-                partial_df.to_csv(checkpoint_path, index=False)
-                print(f"Checkpoint saved to {checkpoint_path}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-            #throttle to avoid Riot rate limits
-            if i + batch_size < len(match_ids):
-                print(f" Sleeping {pause_time} seconds to respect Riot API rate limits...")
-                time.sleep(pause_time)
+        if checkpoint_path and batches_written:
+            final_df = pd.read_parquet(checkpoint_path)
+        else:
+            final_df = self.build_players_frame(all_data)
 
-        if all_data:
-            final_df = pd.concat(all_data, ignore_index=True)
+        if not final_df.empty:
             print(f"\nDone. Processed {len(final_df)} rows in {round(time.time() - start_time, 2)} seconds.")
             return final_df
         else:
             print("\n No valid matches were processed in any batch.")
             return pd.DataFrame()
         
-    def role_gold_diff(players):
-        #calculates role gold diffs for all 5 roles in each match and zero centers them
-        players = players.copy()
-        players['roleGoldDiff'] = 0.0
-
-        #group by match id
-        for match_id, match_df in players.groupby('match_id'):
-            #for each match id compare role gold diff
-            for role, role_group in match_df.groupby('teamPosition'):
-                #validate there is 2 of the same roles for each of the 5 roles in that match
-                if len(role_group) != 2:
-                    continue
-
-                p1, p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['totalGold'] - p2['totalGold']
-                half_diff = abs(diff) / 2
-
-                if diff > 0:
-                    players.loc[p1.name, 'roleGoldDiff'] = +half_diff
-                    players.loc[p2.name, 'roleGoldDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleGoldDiff'] = -half_diff
-                    players.loc[p2.name, 'roleGoldDiff'] = +half_diff
-        return players
-    
-    def role_xp_diff(players):
-        #calculates role xp diff for all 5 roles in each match and zero centers them
-        players = players.copy()
-        players['roleXpDiff'] = 0.0
-        #group by match id and validate there is 2 of the same roles for each of the 5 roles in that match
-        for match_id, match_df in players.groupby('match_id'):
-            for role, role_group in match_df.groupby('teamPosition'):
-                if len(role_group) !=2:
-                    continue 
-                p1,p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['xp'] - p2['xp']
-                half_diff = abs(diff) / 2
-        
-                if diff > 0:
-                    players.loc[p1.name, 'roleXpDiff'] = +half_diff
-                    players.loc[p2.name, 'roleXpDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleXpDiff'] = -half_diff
-                    players.loc[p2.name, 'roleXpDiff'] = +half_diff
-        return players
-    
-    def role_cs_diff(players):
-        #calculates role cs diff for all 5 roles in each match and zero centers them
+    def add_role_diffs(players):
+        #calculates role gold/xp/cs/kill/deaths/vision diffs for all 5 roles in each
+        #match and zero centers them, all in one vectorized pass.
+        #subtracting the lane pair mean gives x - mean(x,y) = +/-(x-y)/2, which is exactly
+        #the +half_diff/-half_diff output the old per-role python loops produced
         players = players.copy()
-        players['roleCsDiff'] = 0.0
-        #group by match id and validate there is 2 of the same roles for each of the 5 roles in that match
-        for match_id, match_df in players.groupby('match_id'):
-            for role, role_group in match_df.groupby('teamPosition'):
-                if len(role_group) !=2:
-                    continue
-                p1,p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['totalMinionsKilled'] -p2['totalMinionsKilled']
-                half_diff = abs(diff) / 2
-
-                if diff > 0:
-                    players.loc[p1.name, 'roleCsDiff'] = +half_diff
-                    players.loc[p2.name, 'roleCsDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleCsDiff'] = -half_diff
-                    players.loc[p2.name, 'roleCsDiff'] = +half_diff 
-        return players
-
-    def role_kill_diff(players):
-        #calulates role kill diff for all 5 roles in each match and zero centers them
-        players = players.copy()
-        players['roleKillDiff'] = 0.0
-        #group by match id and validate there is 2 of the same roles for each of the 5 roles in that match
-        for match_id, match_df in players.groupby('match_id'):
-            for role, role_group in match_df.groupby('teamPosition'):
-                if len(role_group) !=2:
-                    continue
-                p1,p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['kills_14'] - p2['kills_14']
-                half_diff = abs(diff) / 2
-
-                if diff >0:
-                    players.loc[p1.name, 'roleKillDiff'] = +half_diff
-                    players.loc[p2.name, 'roleKillDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleKillDiff'] = -half_diff
-                    players.loc[p2.name, 'roleKillDiff'] = +half_diff
-        return players
-    
-    def role_deaths_diff(players):
-        #caluclate role deaths diff for all 5 roles in each match and zero centers them
-        players = players.copy()
-        players['roleDeathsDiff'] = 0.0
-        #group by match id and validate there is 2 of the same roles for each of the 5 roles in that match
-        for match_id, match_df in players.groupby('match_id'):
-            for role, role_group in match_df.groupby('teamPosition'):
-                if len(role_group) !=2:
-                    continue
-                p1,p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['deaths_14'] - p2['deaths_14']
-                half_diff = abs(diff) / 2
-
-                if diff >0:
-                    players.loc[p1.name, 'roleDeathsDiff'] = +half_diff
-                    players.loc[p2.name, 'roleDeathsDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleDeathsDiff'] = -half_diff
-                    players.loc[p2.name, 'roleDeathsDiff'] = +half_diff
-        return players
-        
-    def role_vision_diff(players):
-        #calculate role vision diff for all 5 roles in each match and zero centers them
-        players = players.copy()
-        players['roleVisionDiff'] = 0.0
-        #group by match id and validate there is 2 of the same roles for each of the 5 roles in that match
-        for match_id, match_df in players.groupby('match_id'):
-            for role, role_group in match_df.groupby('teamPosition'):
-                if len(role_group) !=2:
-                    continue
-                p1,p2 = role_group.iloc[0], role_group.iloc[1]
-                diff = p1['wards_placed'] - p2['wards_placed']
-                half_diff = abs(diff) / 2
-
-                if diff >0:
-                    players.loc[p1.name, 'roleVisionDiff'] = +half_diff
-                    players.loc[p2.name, 'roleVisionDiff'] = -half_diff
-                else:
-                    players.loc[p1.name, 'roleVisionDiff'] = -half_diff
-                    players.loc[p2.name, 'roleVisionDiff'] = +half_diff
-        return players
+
+        #group on int codes instead of the raw keys — factorized match ids and category
+        #codes skip string hashing across all six transforms
+        mid_codes = pd.factorize(players['match_id'])[0]
+        if isinstance(players['teamPosition'].dtype, pd.CategoricalDtype):
+            role_codes = players['teamPosition'].cat.codes.to_numpy()
+        else:
+            role_codes = pd.factorize(players['teamPosition'])[0]
+        g = players.groupby([mid_codes, role_codes])
+        #validate there is 2 of the same roles for each of the 5 roles in that match,
+        #anything else (remakes, weird role assignments) gets a 0.0 diff
+        valid = g['participantId'].transform('size') == 2
+
+        diff_cols = {
+            'roleGoldDiff': 'totalGold',
+            'roleXpDiff': 'xp',
+            'roleCsDiff': 'totalMinionsKilled',
+            'roleKillDiff': 'kills_14',
+            'roleDeathsDiff': 'deaths_14',
+            'roleVisionDiff': 'wards_placed'}
+
+        #compute every diff as a numpy array and attach all six with one assign call,
+        #instead of six separate column insertions on the frame
+        valid_mask = valid.to_numpy()
+        diffs = {}
+        for diff_col, col in diff_cols.items():
+            lane_mean = g[col].transform('mean').to_numpy()
+            diffs[diff_col] = np.where(valid_mask, players[col].to_numpy() - lane_mean,
+                                       0.0).astype(np.float32)
+        return players.assign(**diffs)
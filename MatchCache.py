@@ -0,0 +1,39 @@
+
+import sqlite3
+import orjson
+import zstandard
+
+class MatchCache:
+    #on disk cache for raw riot match/timeline json keyed by match id + endpoint.
+    #match data is immutable once a game ends, so a cache hit never needs to re-check the api.
+    #payloads are zstd compressed json (~5-10x smaller than the raw response)
+    def __init__(self, path='match_cache.sqlite'):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            "match_id TEXT NOT NULL, "
+            "endpoint TEXT NOT NULL, "
+            "payload BLOB NOT NULL, "
+            "PRIMARY KEY (match_id, endpoint))")
+        self.conn.commit()
+        self._compressor = zstandard.ZstdCompressor()
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def get(self, match_id, endpoint):
+        #returns the cached dict or None on a miss
+        row = self.conn.execute(
+            "SELECT payload FROM matches WHERE match_id = ? AND endpoint = ?",
+            (match_id, endpoint)).fetchone()
+        if row is None:
+            return None
+        return orjson.loads(self._decompressor.decompress(row[0]))
+
+    def put(self, match_id, endpoint, data):
+        payload = self._compressor.compress(orjson.dumps(data))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO matches (match_id, endpoint, payload) VALUES (?, ?, ?)",
+            (match_id, endpoint, payload))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,31 @@
+
+from aiolimiter import AsyncLimiter
+
+class RiotRateLimiter:
+    #token bucket rate limiter that sizes itself from riot's X-App-Rate-Limit header.
+    #the header looks like "20:1,100:120" meaning N requests per W second window, so we
+    #keep one AsyncLimiter per advertised window and acquire all of them before a request
+    def __init__(self, requests_per_second=20):
+        #conservative single-window default until the first response reports real limits
+        self._limiters = [AsyncLimiter(requests_per_second, 1)]
+        self._configured = False
+
+    async def acquire(self):
+        for limiter in self._limiters:
+            await limiter.acquire()
+
+    def update_from_headers(self, headers):
+        #rebuild the buckets once, from the first response carrying the app limit header
+        if self._configured:
+            return
+        app_limit = headers.get('X-App-Rate-Limit')
+        if not app_limit:
+            return
+        try:
+            windows = [tuple(int(part) for part in window.split(':'))
+                       for window in app_limit.split(',')]
+        except ValueError:
+            return
+        if windows:
+            self._limiters = [AsyncLimiter(count, period) for count, period in windows]
+            self._configured = True